@@ -6,22 +6,23 @@
 # - 主要目的是讓程式在任何執行位置（例如從 src/jobs、tests、notebooks 或 systemd、Docker）都能穩定找到專案根目錄的 .env。
 # - 透過 _resolve_project_root() 由檔案位置往上回推到專案根目錄，避免依賴「目前工作目錄」。
 # - 仍保留相對/工作目錄的搜尋作為備援，方便臨時測試或單檔執行。
-# - 若安裝了 python-dotenv，優先用 dotenv_values + load_dotenv（可與其他套件共用）；否則採用簡易 parser。
+# - 若安裝了 python-dotenv，優先用 dotenv_values（單次解析，覆蓋策略自行控制）；否則採用簡易 parser。
 # - override=False（預設）以尊重既有系統環境變數，適合 CI/生產；本機若想覆蓋可傳 override=True。
 
+import functools
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 try:
     # python-dotenv 是常見的 .env 讀取套件
     # - dotenv_values(path) 會回傳字典，不直接動 os.environ，方便我們自行決定覆蓋策略
-    # - load_dotenv 會將變數載入 os.environ，且可讓其他依賴 dotenv 的套件/子行程感知
-    from dotenv import load_dotenv, dotenv_values
+    from dotenv import dotenv_values
     DOTENV_AVAILABLE = True
 except ImportError:
     # 若專案未安裝 python-dotenv，程式仍可工作，只是使用簡易的 .env 解析
     DOTENV_AVAILABLE = False
 
+@functools.lru_cache(maxsize=1)
 def _resolve_project_root() -> str:
     """
     推導專案根目錄的路徑。
@@ -53,6 +54,11 @@ DEFAULT_ENV_PATHS = [
     os.path.join(os.getcwd(), ".env"),   # 目前工作目錄（備援，與上一行功能相近）
 ]
 
+# 解析結果快取：鍵為 (path, override)，值為 (mtime, loaded)。
+# 長時間執行或多模組重複呼叫 load_env 時，同一檔案只需解析一次；
+# 檔案若被修改（mtime 改變）則自動重新解析。
+_ENV_CACHE: Dict[Tuple[str, bool], Tuple[float, Dict[str, str]]] = {}
+
 def load_env(env_path: Optional[str] = None, override: bool = False) -> Dict[str, str]:
     """
     載入 .env 中的變數進入 os.environ，並回傳「實際載入（新增或覆蓋）」的鍵值字典。
@@ -71,8 +77,8 @@ def load_env(env_path: Optional[str] = None, override: bool = False) -> Dict[str
     行為說明：
     - 先以本模組的 PROJECT_ROOT 尋址專案根目錄的 .env，確保在不同工作目錄下也能找到。
     - 有安裝 python-dotenv 時：
-        - 先用 dotenv_values 讀出字典，依 override 策略手動寫入 os.environ，同時蒐集 loaded。
-        - 再呼叫 load_dotenv 以便子行程與其他套件感知（注意 load_dotenv 的 override 參數也會影響行為）。
+        - 用 dotenv_values 讀出字典，依 override 策略寫入 os.environ，同時蒐集 loaded
+          （os.environ 會自動傳遞給子行程，無需額外呼叫 load_dotenv）。
     - 未安裝 python-dotenv 時：
         - 使用簡易解析器：忽略空行、註解（# 開頭）、以及無 '=' 的行；支援去除簡單引號/雙引號。
     - 若無法找到 .env（path 最終為 None 或檔案不存在），回傳空字典，不拋例外，方便上層自行決策。
@@ -91,39 +97,59 @@ def load_env(env_path: Optional[str] = None, override: bool = False) -> Dict[str
     if not path or not os.path.isfile(path):
         return loaded
 
+    # 快取命中：同一檔案（mtime 未變）且同一覆蓋策略時，跳過重新解析，
+    # 僅依策略把已知鍵值重新寫回 os.environ（涵蓋期間被外部刪除的情況）
+    mtime = os.stat(path).st_mtime
+    cached = _ENV_CACHE.get((path, override))
+    if cached is not None and cached[0] == mtime:
+        os.environ.update(
+            {k: v for k, v in cached[1].items() if override or k not in os.environ}
+        )
+        return dict(cached[1])
+
     if DOTENV_AVAILABLE:
         # 使用 dotenv_values 先取出鍵值，不直接修改環境，方便我們細緻控制覆蓋邏輯
         values = dotenv_values(path)
-        for k, v in values.items():
-            if v is None:
-                # python-dotenv 可能會對某些格式回傳 None，此處跳過
-                continue
-            if override or (k not in os.environ):
-                # 依策略將值寫入環境變數
-                os.environ[k] = v
-                loaded[k] = v
-        # 再呼叫 load_dotenv：
-        # - 讓依賴 dotenv 的其他程式碼/子行程也能看到這些變數
-        # - 注意：此步驟仍會依 override 參數影響既有值是否被覆蓋
-        load_dotenv(dotenv_path=path, override=override)
+        # 依覆蓋策略先收齊要寫入的鍵值（dotenv 對某些格式會回傳 None，跳過），
+        # 再以單次 dict.update 寫入 os.environ，避免逐鍵觸發 putenv
+        to_set = {
+            k: v for k, v in values.items()
+            if v is not None and (override or k not in os.environ)
+        }
+        os.environ.update(to_set)
+        loaded.update(to_set)
+        # 注意：不再額外呼叫 load_dotenv —— 它會把同一檔案再解析、再寫入一次，
+        # 而 os.environ 本身就會傳遞給子行程，沒有可見的消費者需要 dotenv 內部狀態
     else:
         # 未安裝 python-dotenv 時，使用簡單解析（僅支援最常見的 key=value）
         # 注意：不處理複雜情形（例如多行值、引用其他變數、export 前綴）
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                # 跳過空行與註解
-                if not line or line.startswith("#") or "=" not in line:
-                    continue
-                # 只分割第一個 '='，避免 value 中的 '=' 被誤切
-                k, v = line.split("=", 1)
-                k = k.strip()
-                # 去除首尾引號；不處理跳脫字元等進階情況
-                v = v.strip().strip('"').strip("'")
-                if override or (k not in os.environ):
-                    os.environ[k] = v
-                    loaded[k] = v
+        # 一次讀入整個檔案再 splitlines，str.partition 只切第一個 '='，
+        # 每行的 Python 呼叫次數降到最低
+        with open(path, "rb") as f:
+            text = f.read().decode("utf-8")
+        for line in text.splitlines():
+            if not line:
+                continue
+            # 只分割第一個 '='，避免 value 中的 '=' 被誤切
+            k, sep, v = line.partition("=")
+            if not sep:
+                continue
+            k = k.strip()
+            # 跳過註解與空鍵
+            if not k or k.startswith("#"):
+                continue
+            # 去除首尾引號；不處理跳脫字元等進階情況
+            v = v.strip().strip('"').strip("'")
+            if override:
+                loaded[k] = v
+            elif k not in os.environ and k not in loaded:
+                # 維持原行為：override=False 時同鍵以第一次出現者為準
+                loaded[k] = v
+        # 解析完成後一次寫入 os.environ（見上方 dotenv 分支的說明）
+        os.environ.update(loaded)
 
+    # 寫入快取：下次呼叫若 mtime 未變即可直接重用
+    _ENV_CACHE[(path, override)] = (mtime, dict(loaded))
     return loaded
 
 def get_env(key: str, default: Optional[str] = None, required: bool = False) -> str:
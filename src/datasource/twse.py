@@ -3,15 +3,78 @@
 # 功能：TWSE RWD ETF 兩階段抓取：先列表取代碼，再逐一商品內容
 
 import time
+import asyncio
 import certifi
+import functools
+import itertools
 import requests
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional, Tuple
 from src.common.env_loader import get_env
 
+try:
+    # httpx 為選用套件：提供 AsyncClient（單一連線多工多個 GET），
+    # 搭配 h2 套件時可啟用 HTTP/2，整個掃描只需一次 TLS 握手
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    # h2 為 httpx 的 HTTP/2 支援套件，缺少時退回 HTTP/1.1 連線池
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+try:
+    # orjson 為選用套件：C 實作的 JSON 解析器，直接吃 bytes，較 stdlib 快數倍
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    # brotli 解碼器為選用套件（brotli 或 brotlicffi 擇一）：
+    # 只有裝了才能在 Accept-Encoding 宣告 br，否則 CDN 改送 br 時
+    # 回應 body 無法解壓、JSON 解析必炸
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+def _json_loads(raw: bytes) -> Any:
+    # 統一 JSON 解析入口：有 orjson 用 orjson，否則退回 stdlib json
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    import json
+    return json.loads(raw)
+
+# 刪除表：清掉 ASCII 範圍內所有非英數字元（str.translate 為 C 實作的單次掃描，
+# 取代逐字元的 Python 產生器過濾；實務上代號皆為 ASCII 英數）
+_NON_ALNUM_DEL = str.maketrans("", "", "".join(chr(c) for c in range(128) if not chr(c).isalnum()))
+
 # RWD 端點（可由環境變數覆寫）
 DEFAULT_LIST_URL = "https://www.twse.com.tw/rwd/zh/ETF/list?response=json"
 DEFAULT_PRODUCT_URL_TMPL = "https://www.twse.com.tw/rwd/zh/ETF/productContent?id={code}&response=json"
 
+# 繞過 CDN 快取的 _ 參數只需要「每次不同」，不需要真實時間：
+# 以 import 當下的毫秒時間戳為起點遞增，省去每筆請求一次 gettimeofday 系統呼叫
+_CB = itertools.count(int(time.time() * 1000))
+
+# 模組層共用 Session：整個掃描都對同一主機發請求，
+# 持久連線池可重用 keep-alive socket 與 TLS session，省去每筆請求的握手成本。
+# requests.Session 對多執行緒 GET 是安全的，可供併發 worker 共用。
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
 def _get_timeout(default: float = 10.0) -> float:
     # 從環境讀取 TWSE_TIMEOUT，提供請求逾時秒數
     raw = get_env("TWSE_TIMEOUT", str(default))
@@ -67,9 +130,58 @@ def _headers() -> Dict[str, str]:
     return {
         "User-Agent": ua,
         "Accept": "application/json, text/plain, */*",
-        "Connection": "close",
+        # 明確要求壓縮回應：列表端點內容不小，wire bytes 可大幅縮減
+        # （br 只在本機有解碼器時宣告，見 BROTLI_AVAILABLE）
+        "Accept-Encoding": "gzip, deflate, br" if BROTLI_AVAILABLE else "gzip, deflate",
+        "Connection": "keep-alive",
     }
 
+@dataclass(frozen=True)
+class _TwseCfg:
+    """
+    單次掃描期間不變的設定快照：
+    - 一次讀齊所有 TWSE_* 環境變數與完整請求標頭，
+      避免每筆請求重複做上千次 os.getenv + 字串解析
+    - 測試若 monkeypatch 環境變數，可呼叫 _cfg.cache_clear() 重建快照
+    """
+    timeout: float
+    verify_ssl: bool
+    debug: bool
+    retries: int
+    backoff: float
+    rate_limit_delay: float
+    list_url: str
+    product_url_tmpl: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+@functools.lru_cache(maxsize=1)
+def _cfg() -> _TwseCfg:
+    # 建立設定快照：包含補齊 Referer/Origin 等 RWD 端點常見必要標頭
+    headers = _headers()
+    headers.setdefault("Accept-Language", "zh-TW,zh;q=0.9,en;q=0.8")
+    headers.setdefault("Referer", "https://www.twse.com.tw/rwd/zh/ETF/")
+    headers.setdefault("Origin", "https://www.twse.com.tw")
+    return _TwseCfg(
+        timeout=_get_timeout(),
+        verify_ssl=_get_verify_ssl(),
+        debug=_get_debug(),
+        retries=_get_retries(),
+        backoff=_get_retry_backoff(),
+        rate_limit_delay=_get_rate_limit_delay(),
+        list_url=get_env("TWSE_LIST_URL", DEFAULT_LIST_URL),
+        product_url_tmpl=get_env("TWSE_PRODUCT_URL_TMPL", DEFAULT_PRODUCT_URL_TMPL),
+        headers=headers,
+    )
+
+@functools.lru_cache(maxsize=4)
+def _product_url_parts(tmpl: str) -> Tuple[str, str]:
+    """
+    將商品內容 URL 模板切成 {code} 前後兩段。
+    str.format 每次呼叫都會重新解析模板；切一次之後逐筆只需字串串接。
+    """
+    left, _, right = tmpl.partition("{code}")
+    return left, right
+
 def _verify_target() -> bool | str:
     # 回傳 verify 參數（cert 檔路徑或 False）
     verify_ssl = _get_verify_ssl()
@@ -85,7 +197,7 @@ def _verify_target() -> bool | str:
             pass
         return False
 
-def _request_json(url: str, timeout: float, retries: int, backoff: float) -> Dict[str, Any]:
+def _request_json(url: str, cfg: Optional[_TwseCfg] = None, return_raw: bool = False) -> Any:
     """
     統一 GET 並解析 JSON：
     - 依設定可關閉 SSL 驗證（默認 False）
@@ -93,85 +205,82 @@ def _request_json(url: str, timeout: float, retries: int, backoff: float) -> Dic
     - 僅在 Content-Type 為 application/json 時解析 JSON
     - 若非 JSON，將前 2048 字內容存檔，方便檢視是否被 HTML/WAF 攔截
     - 重試策略：線性倍增 + 抖動
+    設定（標頭/逾時/重試）取自 _cfg() 快照，整個掃描只讀取環境一次。
+    return_raw=True 時回傳 (data, raw_bytes)，供以位元組為鍵的解析快取使用。
     """
     import random
     import urllib3
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-    # 準備請求標頭，補齊常見欄位避免被擋
-    base_headers = _headers()
-    if "Accept" not in base_headers:
-        base_headers["Accept"] = "application/json, text/plain, */*"
-    if "Accept-Language" not in base_headers:
-        base_headers["Accept-Language"] = "zh-TW,zh;q=0.9,en;q=0.8"
-    if "Connection" not in base_headers:
-        base_headers["Connection"] = "keep-alive"
-    # RWD 端點常見需要 Referer/Origin
-    base_headers.setdefault("Referer", "https://www.twse.com.tw/rwd/zh/ETF/")
-    base_headers.setdefault("Origin", "https://www.twse.com.tw")
-
-    debug = _get_debug()
+    if cfg is None:
+        cfg = _cfg()
+
+    debug = cfg.debug
+    retries = cfg.retries
     last_exc: Optional[Exception] = None
 
-    # 使用 Session 可重用連線，並保留 cookies 與重導資訊
-    with requests.Session() as sess:
-        for attempt in range(1, retries + 1):
-            try:
-                resp = sess.get(
-                    url,
-                    headers=base_headers,
-                    timeout=timeout,
-                    verify=False,               # 依需求固定關閉驗證（可切到 _verify_target()）
-                    allow_redirects=True,
+    # 使用模組層共用 Session：跨呼叫重用連線，並保留 cookies 與重導資訊
+    for attempt in range(1, retries + 1):
+        try:
+            resp = _SESSION.get(
+                url,
+                headers=cfg.headers,
+                timeout=cfg.timeout,
+                verify=False,               # 依需求固定關閉驗證（可切到 _verify_target()）
+                allow_redirects=True,
+            )
+
+            # debug：列出重導歷史與最終 URL/狀態碼
+            if debug and resp.history:
+                print(f"[TWSE] Redirect history ({len(resp.history)}):")
+                for i, h in enumerate(resp.history, 1):
+                    print(f"  {i}. {h.status_code} -> {h.headers.get('Location')}")
+            if debug:
+                print(f"[TWSE] Final URL: {resp.url} | Status: {resp.status_code}")
+
+            # 若非 2xx 會 raise_for_status
+            resp.raise_for_status()
+
+            # 僅接受 JSON 回應
+            ctype = (resp.headers.get("Content-Type") or "").lower()
+            if "application/json" not in ctype:
+                # 將內容前 2048 位元組落盤，方便檢查是否 WAF/HTML
+                # 直接切 resp.content 再解碼，避免 resp.text 對整包回應做字集解碼
+                snippet = resp.content[:2048].decode("utf-8", "replace")
+                dump_path = "twse_last_error_snippet.txt"
+                try:
+                    with open(dump_path, "w", encoding="utf-8") as f:
+                        f.write(snippet)
+                except Exception:
+                    pass
+                raise ValueError(
+                    f"非 JSON 回應（Content-Type={ctype}）於 {resp.url}；已落盤前2048字到 {dump_path}"
                 )
 
-                # debug：列出重導歷史與最終 URL/狀態碼
-                if debug and resp.history:
-                    print(f"[TWSE] Redirect history ({len(resp.history)}):")
-                    for i, h in enumerate(resp.history, 1):
-                        print(f"  {i}. {h.status_code} -> {h.headers.get('Location')}")
-                if debug:
-                    print(f"[TWSE] Final URL: {resp.url} | Status: {resp.status_code}")
-
-                # 若非 2xx 會 raise_for_status
-                resp.raise_for_status()
-
-                # 僅接受 JSON 回應
-                ctype = (resp.headers.get("Content-Type") or "").lower()
-                if "application/json" not in ctype:
-                    # 將內容前 2048 字落盤，方便檢查是否 WAF/HTML
-                    txt = resp.text or ""
-                    snippet = txt[:2048]
-                    dump_path = "twse_last_error_snippet.txt"
-                    try:
-                        with open(dump_path, "w", encoding="utf-8") as f:
-                            f.write(snippet)
-                    except Exception:
-                        pass
-                    raise ValueError(
-                        f"非 JSON 回應（Content-Type={ctype}）於 {resp.url}；已落盤前2048字到 {dump_path}"
-                    )
-
-                data = resp.json()
-                if not isinstance(data, dict):
-                    raise ValueError(f"預期 dict，實得 {type(data)}")
-
-                if debug:
-                    preview = str(data)[:300]
-                    print(f"[TWSE] GET {url} -> OK, json_len≈{len(str(data))}, preview={preview!r}")
-
-                return data
-
-            except (requests.RequestException, ValueError) as e:
-                # 記錄最後一次錯誤，並視重試次數決定是否繼續
-                last_exc = e
-                if debug:
-                    print(f"[TWSE] 嘗試 {attempt}/{retries} 失敗：{e}")
-                if attempt == retries:
-                    break
-                # 線性倍增退避 + 少量抖動，降低節流/風控命中
-                sleep_sec = backoff * attempt + random.uniform(0, 0.25)
-                time.sleep(sleep_sec)
+            data = _json_loads(resp.content)
+            if not isinstance(data, dict):
+                raise ValueError(f"預期 dict，實得 {type(data)}")
+
+            if debug:
+                # 避免 str(data) 將整包回應具現化成巨大字串：
+                # 長度以 wire bytes 表示，預覽只列前幾個鍵與其型別
+                preview = repr({k: type(v).__name__ for k, v in list(data.items())[:5]})
+                print(f"[TWSE] GET {url} -> OK, bytes={len(resp.content)}, preview={preview}")
+
+            if return_raw:
+                return data, resp.content
+            return data
+
+        except (requests.RequestException, ValueError) as e:
+            # 記錄最後一次錯誤，並視重試次數決定是否繼續
+            last_exc = e
+            if debug:
+                print(f"[TWSE] 嘗試 {attempt}/{retries} 失敗：{e}")
+            if attempt == retries:
+                break
+            # 線性倍增退避 + 少量抖動，降低節流/風控命中
+            sleep_sec = cfg.backoff * attempt + random.uniform(0, 0.25)
+            time.sleep(sleep_sec)
 
     # 重試用盡仍失敗，丟出 RuntimeError
     raise RuntimeError(f"請求失敗: {url}; 最後錯誤: {last_exc}")
@@ -185,15 +294,12 @@ def fetch_twse_etf_symbols() -> List[str]:
     - 代號可能含有 <br> 分隔的多幣別（如 006205<br>00625K），以及括號附註（如 (新臺幣)）
     """
     # 使用時間戳避免 CDN 快取
-    base = get_env("TWSE_LIST_URL", DEFAULT_LIST_URL)
-    ts = int(time.time() * 1000)
-    url = f"{base}&_={ts}"
-    timeout = _get_timeout()
-    retries = _get_retries()
-    backoff = _get_retry_backoff()
+    cfg = _cfg()
+    ts = next(_CB)
+    url = f"{cfg.list_url}&_={ts}"
 
     # 發請求並檢查狀態
-    data = _request_json(url, timeout, retries, backoff)
+    data = _request_json(url, cfg)
     stat = str(data.get("stat") or "").upper()
     if stat != "OK":
         raise RuntimeError(f"列表 stat 非 OK: {stat}")
@@ -225,8 +331,8 @@ def fetch_twse_etf_symbols() -> List[str]:
             if "(" in p:
                 p = p.split("(", 1)[0]
             p = p.strip()
-            # 僅保留英數，過濾掉空白或註記
-            p = "".join(ch for ch in p if ch.isalnum())
+            # 僅保留英數，過濾掉空白或註記（translate 在 C 層完成掃描）
+            p = p.translate(_NON_ALNUM_DEL)
             if p:
                 out.append(p)
         return out
@@ -252,19 +358,154 @@ def fetch_twse_etf_detail(code: str) -> Dict[str, Any]:
     造訪商品內容端點，回傳單一 ETF 的 JSON 詳細資訊字典。
     端點：/rwd/zh/ETF/productContent?id={code}&response=json&_={ts}
     """
-    # 建構帶時間戳的 URL，繞開快取
-    base_tmpl = get_env("TWSE_PRODUCT_URL_TMPL", DEFAULT_PRODUCT_URL_TMPL)
-    ts = int(time.time() * 1000)
-    url = f"{base_tmpl.format(code=code)}&_={ts}"
-
-    timeout = _get_timeout()
-    retries = _get_retries()
-    backoff = _get_retry_backoff()
+    # 建構帶時間戳的 URL，繞開快取（模板已預先切段，僅需串接）
+    cfg = _cfg()
+    left, right = _product_url_parts(cfg.product_url_tmpl)
+    url = f"{left}{code}{right}&_={next(_CB)}"
 
     # 發請求與狀態檢查
-    data = _request_json(url, timeout, retries, backoff)
+    data = _request_json(url, cfg)
     stat = str(data.get("stat") or "").upper()
     if stat != "OK":
         # 若 TWSE 回 stat 非 OK，視為該代碼暫不可用或被風控
         raise RuntimeError(f"商品內容 stat 非 OK: {stat}; code={code}")
     return data
+
+def fetch_twse_etf_detail_raw(code: str) -> bytes:
+    """
+    與 fetch_twse_etf_detail 相同的請求與狀態檢查，但回傳原始 JSON bytes。
+    供 parse_product_content_from_bytes 以回應位元組為鍵做解析快取。
+    """
+    cfg = _cfg()
+    left, right = _product_url_parts(cfg.product_url_tmpl)
+    url = f"{left}{code}{right}&_={next(_CB)}"
+
+    data, raw = _request_json(url, cfg, return_raw=True)
+    stat = str(data.get("stat") or "").upper()
+    if stat != "OK":
+        raise RuntimeError(f"商品內容 stat 非 OK: {stat}; code={code}")
+    return raw
+
+def get_http_backend() -> str:
+    """
+    回傳掃描使用的 HTTP 後端名稱（由環境變數 TWSE_HTTP_BACKEND 控制）。
+    - "requests"（預設）：共用 Session + 連線池
+    - "httpx"：AsyncClient 非同步路徑（需安裝 httpx；未安裝時退回 requests）
+    - "curl"：libcurl CurlMulti 路徑（需安裝 pycurl；未安裝時退回 requests）
+    """
+    backend = (get_env("TWSE_HTTP_BACKEND", "requests") or "").strip().lower()
+    if backend == "httpx" and not HTTPX_AVAILABLE:
+        return "requests"
+    if backend == "curl":
+        # 延遲匯入避免啟動成本；twse_curl 內部會自行處理 pycurl 缺席
+        from src.datasource.twse_curl import PYCURL_AVAILABLE
+        if not PYCURL_AVAILABLE:
+            return "requests"
+    return backend or "requests"
+
+def make_async_client() -> "httpx.AsyncClient":
+    """
+    建立掃描用的 httpx.AsyncClient：
+    - 有安裝 h2 時啟用 HTTP/2（多個 GET 多工在同一條 TCP/TLS 連線上）
+    - 連線數上限與 keep-alive 數對齊 requests 路徑的連線池設定
+    """
+    if not HTTPX_AVAILABLE:
+        raise RuntimeError("未安裝 httpx，無法使用非同步掃描路徑")
+    return httpx.AsyncClient(
+        http2=H2_AVAILABLE,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+        timeout=_cfg().timeout,
+        verify=False,  # 與 requests 路徑一致：TWSE 常見需關閉驗證
+    )
+
+async def _request_json_async(client: "httpx.AsyncClient", url: str, cfg: Optional[_TwseCfg] = None) -> Dict[str, Any]:
+    """
+    _request_json 的非同步版本：同樣的標頭、JSON 檢查與重試退避策略，
+    但以 await 讓多筆請求在同一事件圈內並行。
+    """
+    import random
+
+    if cfg is None:
+        cfg = _cfg()
+
+    debug = cfg.debug
+    retries = cfg.retries
+    last_exc: Optional[Exception] = None
+
+    for attempt in range(1, retries + 1):
+        try:
+            resp = await client.get(url, headers=cfg.headers, follow_redirects=True)
+            if debug:
+                print(f"[TWSE] Final URL: {resp.url} | Status: {resp.status_code} | HTTP={resp.http_version}")
+            resp.raise_for_status()
+
+            ctype = (resp.headers.get("Content-Type") or "").lower()
+            if "application/json" not in ctype:
+                raise ValueError(f"非 JSON 回應（Content-Type={ctype}）於 {resp.url}")
+
+            data = _json_loads(resp.content)
+            if not isinstance(data, dict):
+                raise ValueError(f"預期 dict，實得 {type(data)}")
+            return data
+
+        except (httpx.HTTPError, ValueError) as e:
+            last_exc = e
+            if debug:
+                print(f"[TWSE] 嘗試 {attempt}/{retries} 失敗：{e}")
+            if attempt == retries:
+                break
+            await asyncio.sleep(cfg.backoff * attempt + random.uniform(0, 0.25))
+
+    raise RuntimeError(f"請求失敗: {url}; 最後錯誤: {last_exc}")
+
+async def fetch_twse_etf_detail_async(client: "httpx.AsyncClient", code: str) -> Dict[str, Any]:
+    """
+    fetch_twse_etf_detail 的非同步版本，與同步版共用 URL 模板與狀態檢查。
+    """
+    cfg = _cfg()
+    left, right = _product_url_parts(cfg.product_url_tmpl)
+    url = f"{left}{code}{right}&_={next(_CB)}"
+
+    data = await _request_json_async(client, url, cfg)
+    stat = str(data.get("stat") or "").upper()
+    if stat != "OK":
+        raise RuntimeError(f"商品內容 stat 非 OK: {stat}; code={code}")
+    return data
+
+async def fetch_twse_etf_details_async(codes: List[str], rate_delay: float = 0.0, concurrency: int = 16) -> List[Tuple[str, Any]]:
+    """
+    以單一 AsyncClient 併發抓取多個代碼的商品內容。
+    - concurrency 控制同時在途的請求數（asyncio.Semaphore）
+    - rate_delay 為整體頻率限制：啟動間隔 rate_delay/concurrency，
+      以「共享的下次可啟動時間」串行錯開（與執行緒版 RateLimiter、
+      twse_curl 的 _maybe_add 同一套 token bucket 邏輯）——
+      若改成各 task 各自 sleep，會變成每隔 interval 齊發 concurrency 筆的突發
+    回傳 [(code, 結果)]，結果為 dict 或抓取失敗的例外物件，由呼叫端決定處理方式。
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+    interval = rate_delay / max(1, concurrency) if rate_delay > 0 else 0.0
+    gate = asyncio.Lock()
+    next_allowed = time.monotonic()
+
+    async def _throttle() -> None:
+        # 只補足「距上次啟動不足的差額」：持鎖期間僅做時間運算，等待在鎖外
+        nonlocal next_allowed
+        if interval <= 0:
+            return
+        async with gate:
+            now = time.monotonic()
+            wait = next_allowed - now
+            next_allowed = max(next_allowed, now) + interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _one(code: str) -> Tuple[str, Any]:
+        async with sem:
+            await _throttle()
+            try:
+                return code, await fetch_twse_etf_detail_async(client, code)
+            except Exception as e:
+                return code, e
+
+    async with make_async_client() as client:
+        return list(await asyncio.gather(*[_one(code) for code in codes]))
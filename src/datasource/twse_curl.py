@@ -0,0 +1,111 @@
+# 檔名：twse_curl.py
+# 專案路徑：src/datasource/twse_curl.py
+# 功能：TWSE 商品內容抓取的 libcurl 後端（pycurl CurlMulti），
+#       以 C 層處理 header/重導/解壓，單一事件圈併發多個 GET。
+#       由環境變數 TWSE_HTTP_BACKEND=curl 啟用；未安裝 pycurl 時自動退回 requests 路徑。
+
+import time
+from io import BytesIO
+from typing import Any, List, Tuple
+
+from src.datasource.twse import _cfg, _json_loads, _product_url_parts, _CB
+
+try:
+    # pycurl 為選用套件：libcurl 綁定，C 層完成連線重用與回應處理
+    import pycurl
+    PYCURL_AVAILABLE = True
+except ImportError:
+    PYCURL_AVAILABLE = False
+
+
+def _new_handle(url: str, headers: List[str], timeout: float) -> Tuple["pycurl.Curl", BytesIO]:
+    # 建立單一 easy handle：回應寫入 BytesIO，關閉憑證驗證（與 requests 路徑一致）
+    buf = BytesIO()
+    c = pycurl.Curl()
+    c.setopt(pycurl.URL, url)
+    c.setopt(pycurl.HTTPHEADER, headers)
+    c.setopt(pycurl.WRITEFUNCTION, buf.write)
+    c.setopt(pycurl.FOLLOWLOCATION, 1)
+    c.setopt(pycurl.SSL_VERIFYPEER, 0)
+    c.setopt(pycurl.SSL_VERIFYHOST, 0)
+    c.setopt(pycurl.TIMEOUT_MS, int(timeout * 1000))
+    c.setopt(pycurl.ACCEPT_ENCODING, "gzip,deflate")
+    return c, buf
+
+
+def fetch_twse_etf_details_curl(codes: List[str], rate_delay: float = 0.0, concurrency: int = 16) -> List[Tuple[str, Any]]:
+    """
+    以 CurlMulti 併發抓取多個代碼的商品內容。
+    - concurrency 控制同時在途的 easy handle 數
+    - rate_delay 為整體頻率限制：新 handle 啟動間隔 rate_delay/concurrency
+    回傳 [(code, 結果)]，結果為 dict 或抓取失敗的例外物件（與 httpx 路徑一致）。
+    """
+    if not PYCURL_AVAILABLE:
+        raise RuntimeError("未安裝 pycurl，無法使用 curl 掃描路徑")
+
+    cfg = _cfg()
+    header_list = [f"{k}: {v}" for k, v in cfg.headers.items()]
+    left, right = _product_url_parts(cfg.product_url_tmpl)
+    interval = rate_delay / max(1, concurrency) if rate_delay > 0 else 0.0
+
+    pending = list(codes)
+    results: dict = {}
+    handle_info: dict = {}  # Curl -> (code, BytesIO)
+    m = pycurl.CurlMulti()
+    in_flight = 0
+    next_start = time.monotonic()
+
+    def _maybe_add() -> None:
+        # 在併發上限與頻率限制允許時，掛上新的 easy handle
+        nonlocal in_flight, next_start
+        while pending and in_flight < max(1, concurrency):
+            if interval > 0 and time.monotonic() < next_start:
+                break
+            code = pending.pop(0)
+            url = f"{left}{code}{right}&_={next(_CB)}"
+            c, buf = _new_handle(url, header_list, cfg.timeout)
+            handle_info[c] = (code, buf)
+            m.add_handle(c)
+            in_flight += 1
+            next_start = time.monotonic() + interval
+
+    _maybe_add()
+    while pending or in_flight:
+        # 推進所有在途傳輸；select 等待 socket 事件或頻率限制窗口
+        while True:
+            ret, _num = m.perform()
+            if ret != pycurl.E_CALL_MULTI_PERFORM:
+                break
+        m.select(min(interval, 1.0) if interval > 0 else 1.0)
+
+        # 收割完成的 handle，解析 JSON 並檢查 stat
+        _nq, ok_list, err_list = m.info_read()
+        for c in ok_list:
+            code, buf = handle_info.pop(c)
+            in_flight -= 1
+            try:
+                status = c.getinfo(pycurl.RESPONSE_CODE)
+                if status != 200:
+                    raise RuntimeError(f"HTTP {status}; code={code}")
+                data = _json_loads(buf.getvalue())
+                stat = str(data.get("stat") or "").upper()
+                if stat != "OK":
+                    raise RuntimeError(f"商品內容 stat 非 OK: {stat}; code={code}")
+                results[code] = data
+            except Exception as e:
+                results[code] = e
+            finally:
+                m.remove_handle(c)
+                c.close()
+        for c, errno, errmsg in err_list:
+            code, buf = handle_info.pop(c)
+            in_flight -= 1
+            results[code] = RuntimeError(f"curl 錯誤 {errno}: {errmsg}; code={code}")
+            m.remove_handle(c)
+            c.close()
+
+        _maybe_add()
+
+    m.close()
+    # 依原始代碼順序回傳
+    return [(code, results[code]) for code in codes if code in results]
@@ -3,7 +3,10 @@
 # 功能：主流程，載入環境、健康檢查、呼叫 TWSE、解析一筆、入庫。
 
 from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from rich.console import Console
+import asyncio
+import threading
 import time
 import os
 
@@ -11,8 +14,43 @@ from src.common.env_loader import load_env, get_env, require_env
 from src.storage.db import healthcheck
 from src.storage.terminal import clear_terminal
 
-from src.datasource.twse import fetch_twse_etf_symbols, fetch_twse_etf_detail
-from src.services.etf_loader import parse_product_content_to_row, upsert_etf_metadata
+from src.datasource.twse import (
+    fetch_twse_etf_symbols,
+    fetch_twse_etf_detail_raw,
+    fetch_twse_etf_details_async,
+    get_http_backend,
+)
+from src.services.etf_loader import (
+    parse_product_content_to_row,
+    parse_product_content_from_bytes,
+    upsert_etf_metadata,
+)
+
+# 每批 UPSERT 的最大筆數：整批寫入攤平 commit 成本，分批避免單一 statement 過大
+UPSERT_BATCH_SIZE = 500
+
+class RateLimiter:
+    """
+    簡易 token bucket：限制兩次 acquire 之間至少間隔 min_interval 秒。
+    - 以 monotonic 時鐘計算，只補足「距上次啟動不足的差額」，
+      回應快慢不會造成多餘等待，也沒有最後一筆之後的死等
+    - 執行緒安全，可供多個抓取 worker 共用
+    """
+    def __init__(self, min_interval: float):
+        self._min_interval = max(0.0, min_interval)
+        self._lock = threading.Lock()
+        # 首次 acquire 不等待
+        self._next_allowed = time.monotonic()
+
+    def acquire(self) -> None:
+        if self._min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_allowed - now
+            self._next_allowed = max(self._next_allowed, now) + self._min_interval
+        if wait > 0:
+            time.sleep(wait)
 
 def _env_source_summary() -> str:
     """
@@ -78,35 +116,74 @@ def main() -> None:
         rate_delay = 60.0
         console.print("[yellow]TWSE_RATE_LIMIT_DELAY 非數值，採用預設 60 秒[/yellow]")
 
-    rows: List[Dict[str, Any]] = []
+    # 併發工作數：抓取為純網路 I/O，使用執行緒池可近似線性縮短總時間
+    try:
+        workers = max(1, int(get_env("TWSE_CONCURRENCY", "8")))
+    except ValueError:
+        workers = 8
+        console.print("[yellow]TWSE_CONCURRENCY 非數值，採用預設 8[/yellow]")
 
-    # 逐筆處理代碼：抓詳細、解析成 row、累積 rows、整批 upsert
-    for i, code in enumerate(symbols, start=1):
-        try:
-            detail = fetch_twse_etf_detail(code)
-            row = parse_product_content_to_row(detail)
-            rows.append(row)
+    # 請求啟動間隔：總頻率不變（rate_delay 內最多 workers 筆），
+    # token bucket 只補足差額，不會在最後一筆之後多等一輪
+    limiter = RateLimiter(rate_delay / workers if rate_delay > 0 else 0.0)
 
-            # 整批 UPSERT：將目前累積的 rows 寫入
-            if rows:
-                try:
-                    affected = upsert_etf_metadata(rows)
-                    console.print(f"[green]UPSERT rows affected[/green]: {affected}")
-                    # 成功寫入後立刻清空暫存，避免重複寫同批資料
-                    rows.clear()
-                except Exception as e:
-                    console.print(f"[red]入庫失敗[/red] code={code}: {e}")
-            else:
-                console.print("[yellow]無有效資料可入庫[/yellow]")
+    def _fetch_throttled(code: str) -> bytes:
+        # 以最小間隔節流請求啟動時間，避免對 TWSE 發送過於頻繁的請求
+        # 回傳原始 bytes，讓解析走以回應內容為鍵的快取
+        limiter.acquire()
+        return fetch_twse_etf_detail_raw(code)
 
-            console.print(f"[green]{i}/{len(symbols)}[/green] 已解析：{code} -> {row['short_name']}")
-
-        except Exception as e:
-            console.print(f"[red]解析失敗[/red] code={code}: {e}")
+    rows: List[Dict[str, Any]] = []
 
-        # 頻率限制間隔：避免對 TWSE RWD API 發送過於頻繁的請求
-        # 注意：最後一圈 sleep 雖非必要，但保留一致行為影響不大
-        time.sleep(rate_delay)
+    backend = get_http_backend()
+    if backend in ("httpx", "curl"):
+        # httpx：單一 AsyncClient 多工所有 GET（h2 可用時走 HTTP/2）
+        # curl：libcurl CurlMulti 事件圈，C 層處理連線與解壓
+        # 兩者皆回傳 [(code, dict 或例外)]，解析仍在主執行緒逐筆進行
+        if backend == "httpx":
+            results = asyncio.run(fetch_twse_etf_details_async(symbols, rate_delay=rate_delay, concurrency=workers))
+        else:
+            from src.datasource.twse_curl import fetch_twse_etf_details_curl
+            results = fetch_twse_etf_details_curl(symbols, rate_delay=rate_delay, concurrency=workers)
+        for done, (code, detail) in enumerate(results, start=1):
+            if isinstance(detail, Exception):
+                console.print(f"[red]解析失敗[/red] code={code}: {detail}")
+                continue
+            try:
+                row = parse_product_content_to_row(detail)
+                rows.append(row)
+                console.print(f"[green]{done}/{len(symbols)}[/green] 已解析：{code} -> {row['short_name']}")
+            except Exception as e:
+                console.print(f"[red]解析失敗[/red] code={code}: {e}")
+    else:
+        # 預設 requests 路徑：併發抓取代碼詳細資料，解析集中在主執行緒進行，避免共享狀態
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            future_to_code = {pool.submit(_fetch_throttled, code): code for code in symbols}
+            for future in as_completed(future_to_code):
+                code = future_to_code[future]
+                done += 1
+                try:
+                    raw = future.result()
+                    row = parse_product_content_from_bytes(raw)
+                    rows.append(row)
+                    console.print(f"[green]{done}/{len(symbols)}[/green] 已解析：{code} -> {row['short_name']}")
+                except Exception as e:
+                    console.print(f"[red]解析失敗[/red] code={code}: {e}")
+
+    # 整批 UPSERT：抓取階段完成後分批寫入（每批 UPSERT_BATCH_SIZE 筆），
+    # 兼顧批次效率與單一 statement 的大小上限
+    if rows:
+        total_affected = 0
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            chunk = rows[start:start + UPSERT_BATCH_SIZE]
+            try:
+                total_affected += upsert_etf_metadata(chunk)
+            except Exception as e:
+                console.print(f"[red]入庫失敗[/red] batch={start}-{start + len(chunk)}: {e}")
+        console.print(f"[green]UPSERT rows affected[/green]: {total_affected}")
+    else:
+        console.print("[yellow]無有效資料可入庫[/yellow]")
 
     elapsed = time.time() - t0
     console.print(f"[cyan]總耗時[/cyan]: {elapsed:.2f}s")
@@ -2,6 +2,7 @@
 # 專案路徑：src/services/etf_loader.py
 # 功能：解析 TWSE ETF 資料、推導屬性、UPSERT 入庫
 
+import functools
 import json
 import datetime
 import re
@@ -9,6 +10,25 @@ from typing import Any, Dict, List, Optional
 
 from src.storage.db import Dao, with_conn
 
+try:
+    # orjson 為選用套件：C 實作的序列化，預設即不跳脫非 ASCII 字元
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _json_dumps(obj: Any) -> str:
+    # 統一 JSON 序列化入口：等價於 json.dumps(obj, ensure_ascii=False)
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, ensure_ascii=False)
+
+def _json_loads(raw: bytes) -> Any:
+    # 統一 JSON 解析入口：有 orjson 用 orjson，否則退回 stdlib json
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
 # 預設交易時間（若 TWSE 未提供精確時段，使用此預設）
 DEFAULT_TRADING_HOURS = {
     "regular": {"start": "09:00", "end": "13:30"},
@@ -24,33 +44,45 @@ DEFAULT_TICK_STEPS = [
     {"min": 1000, "max": None, "tick": 10}
 ]
 DEFAULT_TAX_RATE = 0.001          # 預設交易稅率（千分之一）
+
+# 預設值的 JSON 與最小 tick 都是常數，序列化/推導一次即可，逐筆解析時直接重用
+_DEFAULT_TRADING_HOURS_JSON = _json_dumps(DEFAULT_TRADING_HOURS)
+_DEFAULT_TICK_STEPS_JSON = _json_dumps(DEFAULT_TICK_STEPS)
+_DEFAULT_TICK_UNIT = min(float(seg["tick"]) for seg in DEFAULT_TICK_STEPS)
+
+# 預先編譯熱路徑使用的正規式（逐筆解析時避免每次查 re 模組快取）
+_RE_ISO_DATE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$")
+_RE_DIGITS = re.compile(r"\d+")
+_RE_PCT = re.compile(r"^\s*([0-9]+(?:\.[0-9]+)?)\s*%\s*$")
+_RE_QIANFEN = re.compile(r"千分之\s*([一二三四五六七八九十百千萬0-9\.]+)")
+_RE_NUMS = re.compile(r"[0-9]+(?:\.[0-9]+)?")
+_RE_NON_DIGIT = re.compile(r"\D+")
+
+# 中文數字對照（千分之N 的 N），模組層建立一次即可
+_CN_DIGIT_MAP = {"一":1,"二":2,"三":3,"四":4,"五":5,"六":6,"七":7,"八":8,"九":9,"十":10}
 DEFAULT_EXCHANGE = "TWSE"         # 預設交易所
 DEFAULT_LOT_SIZE = 1000           # 預設交易單位（張/受益權單位）
 FALLBACK_LISTING_DATE = "2000-01-01"  # 日期解析失敗時的保底
 
 # MySQL 相容語法的 UPSERT（使用 ON DUPLICATE KEY UPDATE）
 # 注意：表 etf_metadata 需要在 symbol 欄位建立 UNIQUE 索引以啟用此語法
-UPSERT_SQL = """
-INSERT INTO etf_metadata (
-    symbol, short_name, category, listing_date,
-    tick_unit, tick_steps, trading_hours,
-    transaction_tax_rate, lot_size, exchange, distribution_policy
-) VALUES (
-    %(symbol)s, %(short_name)s, %(category)s, %(listing_date)s,
-    %(tick_unit)s, %(tick_steps)s, %(trading_hours)s,
-    %(transaction_tax_rate)s, %(lot_size)s, %(exchange)s, %(distribution_policy)s
-) ON DUPLICATE KEY UPDATE
-    short_name = VALUES(short_name),
-    category = VALUES(category),
-    listing_date = VALUES(listing_date),
-    tick_unit = VALUES(tick_unit),
-    tick_steps = VALUES(tick_steps),
-    trading_hours = VALUES(trading_hours),
-    transaction_tax_rate = VALUES(transaction_tax_rate),
-    lot_size = VALUES(lot_size),
-    exchange = VALUES(exchange),
-    distribution_policy = VALUES(distribution_policy);
-"""
+# 多筆資料以單一 multi-row VALUES statement 送出（一次 server 往返），
+# 採用 MySQL 8.0.20+ 的列別名語法（AS new）取代已棄用的 VALUES() 函式
+ETF_METADATA_COLUMNS = (
+    "symbol", "short_name", "category", "listing_date",
+    "tick_unit", "tick_steps", "trading_hours",
+    "transaction_tax_rate", "lot_size", "exchange", "distribution_policy",
+)
+# 前綴不含 VALUES：由 Dao.execute_values 負責串接 "VALUES (...),(...)"
+UPSERT_SQL_PREFIX = (
+    "INSERT INTO etf_metadata (" + ", ".join(ETF_METADATA_COLUMNS) + ")"
+)
+_UPSERT_ROW_TEMPLATE = "(" + ", ".join(["%s"] * len(ETF_METADATA_COLUMNS)) + ")"
+UPSERT_SQL_SUFFIX = " AS new ON DUPLICATE KEY UPDATE " + ", ".join(
+    f"{col} = new.{col}" for col in ETF_METADATA_COLUMNS if col != "symbol"
+)
+# 單一 statement 的最大列數：避免超過 max_allowed_packet
+_UPSERT_CHUNK = 500
 
 def _normalize_date_to_iso(date_str: str) -> Optional[str]:
     """
@@ -64,7 +96,7 @@ def _normalize_date_to_iso(date_str: str) -> Optional[str]:
     s = s[:10]
     # 將 . 或 / 轉成 -
     s = s.replace("/", "-").replace(".", "-")
-    m = re.match(r"^(\d{4})-(\d{1,2})-(\d{1,2})$", s)
+    m = _RE_ISO_DATE.match(s)
     if not m:
         return None
     y, mo, d = m.groups()
@@ -77,7 +109,7 @@ def _extract_int_from_text(text: str) -> Optional[int]:
     """
     if not isinstance(text, str):
         return None
-    digits = re.findall(r"\d+", text.replace(",", ""))
+    digits = _RE_DIGITS.findall(text.replace(",", ""))
     if not digits:
         return None
     try:
@@ -97,16 +129,15 @@ def _parse_tax_rate(text: str) -> Optional[float]:
         return None
     s = text.strip()
     # 百分比格式
-    m = re.match(r"^\s*([0-9]+(?:\.[0-9]+)?)\s*%\s*$", s)
+    m = _RE_PCT.match(s)
     if m:
         return float(m.group(1)) / 100.0
     # 千分之N（中文）
-    m = re.search(r"千分之\s*([一二三四五六七八九十百千萬0-9\.]+)", s)
+    m = _RE_QIANFEN.search(s)
     if m:
         num = m.group(1)
-        mapping = {"一":1,"二":2,"三":3,"四":4,"五":5,"六":6,"七":7,"八":8,"九":9,"十":10}
-        if num in mapping:
-            return mapping[num] / 1000.0
+        if num in _CN_DIGIT_MAP:
+            return _CN_DIGIT_MAP[num] / 1000.0
         try:
             return float(num) / 1000.0
         except Exception:
@@ -127,7 +158,7 @@ def _parse_tick_steps_from_text(text: str) -> Optional[List[Dict[str, Any]]]:
         return None
     s = text.replace("；", ";").replace("，", ",")
     # 寬鬆解析：找出所有數字，常見會得到 [threshold, tick1, threshold2?, tick2]
-    nums = re.findall(r"[0-9]+(?:\.[0-9]+)?", s)
+    nums = _RE_NUMS.findall(s)
     if len(nums) >= 3:
         try:
             threshold = float(nums[0])     # 第一個數字視為區分門檻
@@ -176,7 +207,8 @@ def _as_int(s: Any) -> Optional[int]:
     if isinstance(s, (int, float)):
         return int(s)
     if isinstance(s, str):
-        digits = "".join(ch for ch in s if ch.isdigit())
+        # 以預編譯正規式一次移除非數字字元，取代逐字元過濾
+        digits = _RE_NON_DIGIT.sub("", s)
         return int(digits) if digits.isdigit() else None
     return None
 
@@ -209,14 +241,62 @@ def _guess_distribution_policy(detail: Dict[str, Any]) -> str:
                         return v.strip()
     return "未提供"
 
+@functools.lru_cache(maxsize=8)
+def _field_index(fields_tuple: tuple) -> Dict[str, int]:
+    """
+    欄位名稱到索引的對照表。
+    同一次掃描中所有 ETF 的 fields 內容相同，以 tuple 為鍵快取後只需建一次。
+    """
+    return {name: i for i, name in enumerate(fields_tuple)}
+
+# 結構驗證旗標：同一程序內首筆資料通過嚴格驗證後，
+# 後續資料走跳過 isinstance 檢查的快速路徑（結構異常時自動退回嚴格路徑）
+_schema_validated = False
+
 def parse_product_content_to_row(detail: Dict[str, Any]) -> Dict[str, Any]:
     """
     將 TWSE 商品內容 JSON 解析為 etf_metadata 表的一筆資料列（dict）。
     - 使用 tables[0].fields 與 tables[0].data[0] 一一對應抽取欄位
     - category 優先取 tables[0] 的「ETF類別」，其次使用最外層 type
     - 對交易單位/稅率/日期/升降單位做必要正規化與推導
+    首筆以嚴格檢查驗證結構，之後改走快速路徑（TWSE 回應結構在單次掃描內固定）。
     """
-    # 基本狀態檢查
+    global _schema_validated
+    if _schema_validated:
+        try:
+            return _parse_fast(detail)
+        except (KeyError, IndexError, TypeError, AttributeError):
+            # 結構與預期不符：退回嚴格路徑，產生明確的錯誤訊息
+            return _parse_strict(detail)
+    result = _parse_strict(detail)
+    _schema_validated = True
+    return result
+
+@functools.lru_cache(maxsize=1024)
+def _parse_from_bytes_cached(raw: bytes) -> Dict[str, Any]:
+    # 以原始回應 bytes 為鍵的解析快取：同一程序內重跑掃描/重試時，
+    # 相同 payload 的解析成本降為一次 dict 查找
+    return parse_product_content_to_row(_json_loads(raw))
+
+def parse_product_content_from_bytes(raw: bytes) -> Dict[str, Any]:
+    """
+    從 TWSE 商品內容的原始 JSON bytes 解析出資料列。
+    結果以 raw bytes 為鍵做 lru_cache（上限 1024 筆）；
+    回傳淺複本，避免呼叫端改動污染快取內容。
+    """
+    return dict(_parse_from_bytes_cached(raw))
+
+def _parse_fast(detail: Dict[str, Any]) -> Dict[str, Any]:
+    # 快速路徑：直接索引，不做逐層 isinstance 防衛檢查
+    stat = str(detail.get("stat", "")).lower()
+    if stat != "ok":
+        raise ValueError(f"productContent stat 非 ok: {detail.get('stat')}")
+    main = detail["tables"][0]
+    fields = main.get("fields") or []
+    return _extract_row(detail, main, fields, main["data"][0])
+
+def _parse_strict(detail: Dict[str, Any]) -> Dict[str, Any]:
+    # 嚴格路徑：完整驗證結構後再抽取欄位
     stat = str(detail.get("stat", "")).lower()
     if stat != "ok":
         raise ValueError(f"productContent stat 非 ok: {detail.get('stat')}")
@@ -233,9 +313,12 @@ def parse_product_content_to_row(detail: Dict[str, Any]) -> Dict[str, Any]:
     if not isinstance(data, list) or not data or not isinstance(data[0], list):
         raise ValueError("tables[0].data 缺失或格式不正確")
 
-    row = data[0]
-    # 建立欄位名稱到索引的對照表，方便以名稱取值
-    idx = {name: i for i, name in enumerate(fields)}
+    return _extract_row(detail, main, fields, data[0])
+
+def _extract_row(detail: Dict[str, Any], main: Dict[str, Any], fields: List[str], row: List[Any]) -> Dict[str, Any]:
+    # 共用抽取邏輯：由嚴格與快速路徑共同呼叫
+    # 欄位名稱到索引的對照表，同一掃描內 fields 相同時直接命中快取
+    idx = _field_index(tuple(fields))
 
     def get_field(name: str) -> Optional[str]:
         # 依欄位名取值，並盡量轉成字串回傳
@@ -273,27 +356,29 @@ def parse_product_content_to_row(detail: Dict[str, Any]) -> Dict[str, Any]:
     tax_rate = _parse_tax_rate(tax_text)
     transaction_tax_rate = tax_rate if tax_rate is not None else DEFAULT_TAX_RATE
 
-    # 升降單位：嘗試解析 tick_steps；失敗使用預設；tick_unit 取最小 tick
+    # 升降單位：嘗試解析 tick_steps；失敗使用預先序列化的預設；tick_unit 取最小 tick
     tick_text = get_field("升降單位") or ""
     parsed_steps = _parse_tick_steps_from_text(tick_text)
-    tick_steps = parsed_steps if parsed_steps else DEFAULT_TICK_STEPS
-    tick_unit = derive_tick_unit_from_steps(tick_steps)
+    if parsed_steps:
+        tick_steps_json = _json_dumps(parsed_steps)
+        tick_unit = derive_tick_unit_from_steps(parsed_steps)
+    else:
+        tick_steps_json = _DEFAULT_TICK_STEPS_JSON
+        tick_unit = _DEFAULT_TICK_UNIT
 
     # 收益分配：若欄位不存在以「未提供」表示
     distribution_policy = (get_field("收益分配") or "").strip() or "未提供"
 
-    # 交易時間：若未解析出實際時段，採用預設
-    trading_hours = DEFAULT_TRADING_HOURS
-
-    # 注意：tick_steps 與 trading_hours 存成 JSON 字串，以便直接存入 TEXT/JSON 欄位
+    # 注意：tick_steps 與 trading_hours 存成 JSON 字串，以便直接存入 TEXT/JSON 欄位；
+    # 交易時間目前固定為預設時段，直接使用模組層序列化好的常數
     return {
         "symbol": symbol,
         "short_name": short_name,
         "category": category,
         "listing_date": listing_date,
         "tick_unit": tick_unit,
-        "tick_steps": json.dumps(tick_steps, ensure_ascii=False),
-        "trading_hours": json.dumps(trading_hours, ensure_ascii=False),
+        "tick_steps": tick_steps_json,
+        "trading_hours": _DEFAULT_TRADING_HOURS_JSON,
         "transaction_tax_rate": transaction_tax_rate,
         "lot_size": lot_size,
         "exchange": DEFAULT_EXCHANGE,
@@ -302,15 +387,25 @@ def parse_product_content_to_row(detail: Dict[str, Any]) -> Dict[str, Any]:
 
 def upsert_etf_metadata(rows: List[Dict[str, Any]]) -> int:
     """
-    將解析好的多筆 rows 以 UPSERT_SQL 一次性寫入/更新。
-    - 使用 Dao.executemany 逐筆執行（以確保每筆 mapping 與命名參數 %(key)s 對齊）
+    將解析好的多筆 rows 一次性寫入/更新。
+    - 透過 Dao.execute_values 組成 multi-row INSERT ... VALUES (...),(...)
+      AS new ON DUPLICATE KEY UPDATE，每頁（_UPSERT_CHUNK 筆）一次 server 往返，
+      且每列參數在 client 端以 mogrify 直接格式化，免去 executemany 的逐列解析
     - 成功則 commit，失敗則 rollback 並拋出例外
     回傳：受影響列數（rowcount 累計）
     """
     def _op(conn):
         try:
-            # 關鍵：此 SQL 使用命名參數 %(key)s，因此 rows 需為 dict 的 iterable（mapping）
-            affected = Dao.executemany(conn, UPSERT_SQL, rows)
+            # 依固定欄位順序轉成位置參數 tuple
+            params_rows = [tuple(r[col] for col in ETF_METADATA_COLUMNS) for r in rows]
+            affected = Dao.execute_values(
+                conn,
+                UPSERT_SQL_PREFIX,
+                params_rows,
+                template=_UPSERT_ROW_TEMPLATE,
+                suffix=UPSERT_SQL_SUFFIX,
+                page_size=_UPSERT_CHUNK,
+            )
             Dao.commit(conn)
             return affected
         except Exception as e:
@@ -2,16 +2,59 @@
 # 專案路徑：src/storage/db.py
 # 功能：連線池管理、取得連線、簡易 DAO 封裝、健康檢查。
 
+import csv
+import hashlib
+import itertools
 import os
+import queue
+import re
+import sys
+import tempfile
 import pymysql
 import threading
-from typing import Any, Dict, Optional, Callable, Iterable, List
+import time
+from typing import Any, Dict, Optional, Callable, Iterable, List, Tuple
 
 from src.common.env_loader import load_env, get_env
 
+try:
+    # cachetools 提供 TTL+LRU 的現成實作，用於唯讀查詢結果快取
+    from cachetools import TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    CACHETOOLS_AVAILABLE = False
+
 # 初始化環境變數（若 .env 存在會載入，讓下方用 get_env 取得設定）
 load_env()
 
+# 驅動選擇：DB_DRIVER=mysqlclient 時改用 C 實作的 MySQLdb（mysqlclient 套件），
+# wire protocol 解碼與 executemany 改寫都在 C 層完成，列解碼快數倍；
+# 兩者皆為 DB-API 2.0，下方程式只經由 _driver/_cursors 間接取用。
+# 預設與退回（未安裝、或 DB_DRIVER 未設）皆為 pymysql。
+MYSQLCLIENT_ACTIVE = False
+_driver = pymysql
+_cursors = pymysql.cursors
+_PROGRAMMING_ERRORS: tuple = (pymysql.err.ProgrammingError,)
+if get_env("DB_DRIVER", "pymysql").lower() in ("mysqlclient", "mysqldb"):
+    try:
+        import MySQLdb as _mysqldb
+        import MySQLdb.cursors as _mysqldb_cursors
+        _driver = _mysqldb
+        _cursors = _mysqldb_cursors
+        _PROGRAMMING_ERRORS = (pymysql.err.ProgrammingError, _mysqldb.ProgrammingError)
+        MYSQLCLIENT_ACTIVE = True
+    except ImportError:
+        # 未安裝 mysqlclient 時靜默退回 pymysql，不影響功能
+        pass
+
+def _get_bulk_batch(default: int = 1000) -> int:
+    # 批次執行的單批列數上限，可由環境變數 DB_BULK_BATCH 控制，預設 1000
+    raw = get_env("DB_BULK_BATCH", str(default))
+    try:
+        return max(1, int(raw))
+    except Exception:
+        return default
+
 def _get_pool_size(default: int = 5) -> int:
     # 連線池大小可由環境變數 DB_POOL_SIZE 控制，預設 5
     raw = get_env("DB_POOL_SIZE", str(default))
@@ -20,18 +63,34 @@ def _get_pool_size(default: int = 5) -> int:
     except Exception:
         return default
 
+# 連線歸還後閒置多久才需在取出時 ping 驗活（秒）
+_PING_IDLE_THRESHOLD = 5.0
+
+# 突發容量：池總容量為 maxsize * _BURST_FACTOR，超出 maxsize 的部分
+# 視為 burst 連線，閒置超過 _IDLE_EVICT_SECS 會被背景清掃關閉
+_BURST_FACTOR = 2
+_IDLE_EVICT_SECS = 60.0
+_EVICT_INTERVAL_SECS = 30.0
+
 class MySQLPool:
     """
     非阻塞、簡易版的連線池：
-    - 使用 list 當作池，配合 Lock 確保執行緒安全
+    - 使用 queue.SimpleQueue（C 實作，快速路徑無鎖），取代 list+Lock，
+      高併發下 acquire/release 不再搶同一把鎖
+    - 以 Semaphore 計數池內剩餘名額，取代持鎖檢查 len(pool)
     - acquire：若池內有連線就取出，否則新建
     - release：若池未滿放回，否則關閉
     - closeall：關閉池內所有連線
     """
     def __init__(self, maxsize: int = 5):
         self._maxsize = maxsize
-        self._pool: List[pymysql.connections.Connection] = []
-        self._lock = threading.Lock()
+        self._pool: "queue.SimpleQueue[pymysql.connections.Connection]" = queue.SimpleQueue()
+        # 空位計數：release 搶到名額才放回池，避免池無限制增長。
+        # 容量放寬到 maxsize 的 _BURST_FACTOR 倍：突發流量下不會一邊關連線
+        # 一邊重建（connect storm），多出的 burst 連線由背景清掃在閒置後回收
+        self._slots = threading.Semaphore(maxsize * _BURST_FACTOR)
+        self._evict_timer: Optional[threading.Timer] = None
+        self._schedule_evict()
         self._config = {
             "host": get_env("DB_HOST", "localhost"),
             "port": int(get_env("DB_PORT", "3306")),
@@ -39,45 +98,122 @@ class MySQLPool:
             "password": get_env("DB_PASSWORD", ""),
             "database": get_env("DB_NAME", "twa_etf_engine"),
             "charset": "utf8mb4",
-            "cursorclass": pymysql.cursors.DictCursor,  # 讓 fetch 回來是 dict，便於後續處理
+            "cursorclass": _cursors.Cursor,  # 預設 tuple cursor：免去逐列建 dict 的開銷，需要 dict 時用 Dao.query_dict
             "autocommit": False,                        # 由 Dao 控制交易
+            "local_infile": True,                       # 允許 LOAD DATA LOCAL INFILE（見 Dao.bulk_load）
         }
+        # 預熱：DB_EAGER_FILL=1 時於啟動即併發建滿 maxsize 條連線，
+        # 讓前 N 次 acquire 不必各付一次 TCP 握手 + MySQL 認證成本；
+        # 預設關閉（測試與短命腳本不需要）
+        if get_env("DB_EAGER_FILL", "0") == "1":
+            self._eager_fill()
+
+    def _eager_fill(self) -> None:
+        # 併發建線把握手延遲攤平在 maxsize 條執行緒上；失敗（DB 尚未就緒等）
+        # 不視為致命錯誤，留給之後的 acquire 惰性補建
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self._maxsize) as pool:
+            futures = [pool.submit(self._create_conn) for _ in range(self._maxsize)]
+            for f in futures:
+                try:
+                    self.release(f.result())
+                except Exception:
+                    pass
 
     def _create_conn(self) -> pymysql.connections.Connection:
-        # 以目前設定建立新連線
-        return pymysql.connect(**self._config)
+        # 以目前設定建立新連線（依 DB_DRIVER 選定的驅動）
+        return _driver.connect(**self._config)
+
+    def _schedule_evict(self) -> None:
+        # 週期性背景清掃（daemon timer，不阻止程序結束）
+        t = threading.Timer(_EVICT_INTERVAL_SECS, self._evict_idle)
+        t.daemon = True
+        t.start()
+        self._evict_timer = t
+
+    def _evict_idle(self) -> None:
+        # 回收閒置的 burst 連線：
+        # - 依最近使用時間排序，前 maxsize 條為核心連線、永不回收
+        # - 其餘（burst）若閒置超過 _IDLE_EVICT_SECS 則關閉並釋放名額
+        drained: List[pymysql.connections.Connection] = []
+        while True:
+            try:
+                drained.append(self._pool.get_nowait())
+            except queue.Empty:
+                break
+        now = time.monotonic()
+        drained.sort(key=lambda c: getattr(c, "_last_used", 0.0), reverse=True)
+        for i, conn in enumerate(drained):
+            idle = now - getattr(conn, "_last_used", 0.0)
+            if i < self._maxsize or idle <= _IDLE_EVICT_SECS:
+                self._pool.put(conn)
+            else:
+                self._slots.release()
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        self._schedule_evict()
 
     def acquire(self) -> pymysql.connections.Connection:
         # 取得連線：優先用池內現有連線，否則建立新連線
-        with self._lock:
-            if self._pool:
-                return self._pool.pop()
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
             return self._create_conn()
-
-    def release(self, conn: pymysql.connections.Connection) -> None:
-        # 釋放連線：若池未滿則放回，否則關閉（避免池無限制增長）
-        with self._lock:
+        # 從池中取走一條連線，等於空出一個可放回的名額
+        self._slots.release()
+        # 閒置超過 wait_timeout 的連線下一次查詢會直接失敗，
+        # 取出時以 ping(reconnect=True) 做活性檢查；剛用過（<5 秒）的連線
+        # 幾乎不可能已死，跳過 ping 省掉熱路徑上的一次往返
+        last_used = getattr(conn, "_last_used", 0.0)
+        if time.monotonic() - last_used >= _PING_IDLE_THRESHOLD:
             try:
-                if len(self._pool) < self._maxsize:
-                    self._pool.append(conn)
-                else:
-                    conn.close()
+                # 位置參數傳 True：MySQLdb 的 C 實作不接受 reconnect= 關鍵字
+                tid = conn.thread_id()
+                conn.ping(True)
+                if conn.thread_id() != tid:
+                    # ping 觸發透明重連：server 端 session 已換，
+                    # 其上的 prepared statement 全數失效，必須清掉快取
+                    # 讓 _try_prepared 重新 PREPARE
+                    cache = getattr(conn, "_twa_stmt_cache", None)
+                    if cache:
+                        cache.clear()
             except Exception:
-                # 發生例外時保守起見嘗試關閉連線
                 try:
                     conn.close()
                 except Exception:
                     pass
+                return self._create_conn()
+        return conn
+
+    def release(self, conn: pymysql.connections.Connection) -> None:
+        # 釋放連線：搶到名額就放回池，否則關閉（避免池無限制增長）
+        if self._slots.acquire(blocking=False):
+            # 記錄歸還時間，供 acquire 判斷是否需要 ping
+            conn._last_used = time.monotonic()
+            self._pool.put(conn)
+        else:
+            try:
+                conn.close()
+            except Exception:
+                pass
 
     def closeall(self) -> None:
         # 關閉池內所有連線（通常在進程結束或重啟時）
-        with self._lock:
-            for c in self._pool:
-                try:
-                    c.close()
-                except Exception:
-                    pass
-            self._pool.clear()
+        if self._evict_timer is not None:
+            self._evict_timer.cancel()
+            self._evict_timer = None
+        while True:
+            try:
+                c = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._slots.release()
+            try:
+                c.close()
+            except Exception:
+                pass
 
 # 建立單例連線池（整個程序共用）
 _pool = MySQLPool(maxsize=_get_pool_size())
@@ -104,61 +240,379 @@ def with_conn(func: Callable[[pymysql.connections.Connection], Any]) -> Any:
     finally:
         release_conn(conn)
 
-class Dao:
+# 唯讀查詢結果快取：
+# - 依 ttl 分桶的 TTLCache（maxsize 1024），以 (sql, 正規化後參數) 為鍵
+# - 寫入類語句與 FOR UPDATE 一律不快取
+# - RLock 保護多執行緒存取
+_RESULT_CACHES: Dict[float, "TTLCache"] = {}
+_RESULT_CACHE_LOCK = threading.RLock()
+_UNCACHEABLE_SQL = re.compile(r"\b(insert|update|delete|replace|for\s+update)\b", re.IGNORECASE)
+
+def _result_cache(ttl: float) -> "TTLCache":
+    # 每個 ttl 值一個 TTLCache（實務上只會有少數幾種 ttl）
+    cache = _RESULT_CACHES.get(ttl)
+    if cache is None:
+        cache = TTLCache(maxsize=1024, ttl=ttl)
+        _RESULT_CACHES[ttl] = cache
+    return cache
+
+def _cache_key(sql: str, params: Optional[Any]) -> Tuple[str, Any]:
+    # 參數正規化成可雜湊鍵：dict 依鍵排序、序列轉 tuple
+    if isinstance(params, dict):
+        return sql, tuple(sorted(params.items()))
+    if isinstance(params, (list, tuple)):
+        return sql, tuple(params)
+    return sql, params
+
+class _InternFieldsMixin:
     """
-    最小可用的 DAO 封裝：
-    - execute：單次 SQL 執行，回傳受影響列數
-    - executemany：迭代 rows 並逐筆執行（此版本非真正的批次協議，但簡單穩定）
-    - query：執行查詢並回傳 list[dict]
-    - commit/rollback：交易控制（autocommit=False）
+    讓 dict cursor 的欄名走 sys.intern：
+    pymysql 每次查詢都重建欄名字串，百萬列 × N 欄會產生大量重複 str；
+    intern 後所有 row dict 共用同一份鍵（單一配置、共用雜湊值），
+    記憶體與 dict 建構成本同時下降。對呼叫端完全透明。
     """
-    @staticmethod
-    def execute(conn: pymysql.connections.Connection, sql: str, params: Optional[Dict[str, Any]] = None) -> int:
-        # 注意：若 SQL 使用 %(key)s 命名參數，params 必須是 dict（mapping）
-        with conn.cursor() as cur:
+    def _do_get_result(self):
+        super()._do_get_result()
+        fields = getattr(self, "_fields", None)
+        if fields:
+            self._fields = [sys.intern(f) for f in fields]
+
+class InternedSSDictCursor(_InternFieldsMixin, pymysql.cursors.SSDictCursor):
+    pass
+
+# iter_query 使用的 unbuffered dict cursor：
+# pymysql 用 interned 版；MySQLdb 的 cursor 內部結構不同，維持原生實作
+_SS_DICT_CURSOR = _cursors.SSDictCursor if MYSQLCLIENT_ACTIVE else InternedSSDictCursor
+
+# SQL 識別字白名單（bulk_load 的 table/columns 無法參數化，僅接受英數與底線）
+_IDENT_RE = re.compile(r"[A-Za-z0-9_]+")
+
+# 可走 server-side prepared statement 的語句開頭（DDL 一律跳過）
+_PREPARABLE_PREFIXES = ("select", "insert", "update", "delete", "replace")
+
+def _stmt_cache(conn: pymysql.connections.Connection) -> Dict[str, Optional[str]]:
+    # prepared statement 快取掛在連線物件上（sql -> 語句名；None 表示不可 prepare），
+    # 連線關閉時 server 端語句與快取一併消失，不需額外失效處理
+    cache = getattr(conn, "_twa_stmt_cache", None)
+    if cache is None:
+        cache = {}
+        setattr(conn, "_twa_stmt_cache", cache)
+    return cache
+
+def _try_prepared(cur, conn: pymysql.connections.Connection, sql: str, params: Optional[Any]) -> bool:
+    """
+    嘗試以 PREPARE/EXECUTE 執行：同一連線上重複的 SQL 免去 server 端重複解析與規劃。
+    - 僅處理 DML/SELECT 與位置參數（dict 命名參數無法對應 USING 順序，跳過）
+    - 首次 PREPARE 失敗時記為不可 prepare，之後直接走一般路徑
+    回傳 True 表示已用 prepared 路徑執行完畢。
+    """
+    head = sql.lstrip()[:8].lower()
+    if not head.startswith(_PREPARABLE_PREFIXES):
+        return False
+    if params is not None and not isinstance(params, (list, tuple)):
+        return False
+
+    cache = _stmt_cache(conn)
+    name = cache.get(sql, "")
+    if name is None:
+        # 先前判定過此 SQL 無法 prepare
+        return False
+    if name == "":
+        # 尚未 prepare：client 端 %s 佔位需改為 server 端的 ?
+        name = "s_" + hashlib.blake2b(sql.encode(), digest_size=8).hexdigest()
+        try:
+            cur.execute(f"PREPARE {name} FROM %s", (sql.replace("%s", "?"),))
+        except _PROGRAMMING_ERRORS:
+            cache[sql] = None
+            return False
+        cache[sql] = name
+
+    if params:
+        # 參數先綁到使用者變數，再以 USING 傳入
+        assigns = ", ".join(f"@p{i}=%s" for i in range(len(params)))
+        cur.execute("SET " + assigns, tuple(params))
+        cur.execute(f"EXECUTE {name} USING " + ", ".join(f"@p{i}" for i in range(len(params))))
+    else:
+        cur.execute(f"EXECUTE {name}")
+    return True
+
+# DAO 實作改為模組層函式（dao_*）：
+# - 免去每次呼叫的類別屬性查找與 descriptor 層
+# - 高 QPS 的 healthcheck / 內迴圈 DAO 路徑上是小而穩定的節省
+# 下方的 Dao 類僅作薄相容層，舊呼叫端（Dao.execute 等）不需改動。
+
+def dao_execute(conn: pymysql.connections.Connection, sql: str, params: Optional[Any] = None) -> int:
+    # 單次 SQL 執行，回傳受影響列數。
+    # 注意：若 SQL 使用 %(key)s 命名參數，params 必須是 dict（mapping）；
+    # 位置參數 %s 則傳 list/tuple（如 multi-row VALUES 的攤平參數）
+    with conn.cursor() as cur:
+        if not _try_prepared(cur, conn, sql, params):
             cur.execute(sql, params or {})
-            return cur.rowcount
+        return cur.rowcount
 
-    @staticmethod
-    def executemany(conn: pymysql.connections.Connection, sql: str, rows: Iterable[Dict[str, Any]]) -> int:
-        # 逐筆執行，每筆回傳 rowcount 相加，適用命名參數的 dict rows
-        affected = 0
+def dao_executemany(conn: pymysql.connections.Connection, sql: str, rows: Iterable[Any]) -> int:
+    # 使用驅動原生的 cursor.executemany：對 INSERT/REPLACE ... VALUES 類語句，
+    # PyMySQL 會改寫成單一 multi-row statement，N 筆只需一次 server 往返
+    # （命名參數 %(key)s 的 dict rows 與位置參數的 tuple rows 皆支援）。
+    # 以 DB_BULK_BATCH 分批，避免超大 iterable 一次具現化進記憶體/封包
+    rows_list = rows if isinstance(rows, list) else list(rows)
+    batch = _get_bulk_batch()
+    affected = 0
+    with conn.cursor() as cur:
+        for start in range(0, len(rows_list), batch):
+            cur.executemany(sql, rows_list[start:start + batch])
+            affected += cur.rowcount
+    return affected
+
+def dao_execute_values(conn: pymysql.connections.Connection, sql_prefix: str, rows: Iterable[Any], template: str, suffix: str = "", page_size: int = 1000) -> int:
+    """
+    psycopg2 execute_values 風格的多列執行：
+    - 每列以 cur.mogrify(template, row) 先在 client 端格式化，
+      整頁串成單一 "prefix VALUES (...),(...) suffix" 後一次 execute
+    - 相比 executemany 省掉每列的 format-string 解析與參數處理迴圈，
+      熱路徑上的大量 INSERT 有顯著差距
+    - template 形如 "(%s, %s, %s)"；suffix 可放 ON DUPLICATE KEY UPDATE 等尾段
+    以 page_size 分頁，避免單一 statement 超過 max_allowed_packet。
+    回傳受影響列數；呼叫端自行 commit。
+    """
+    rows_list = rows if isinstance(rows, list) else list(rows)
+    affected = 0
+    with conn.cursor() as cur:
+        for start in range(0, len(rows_list), page_size):
+            page = rows_list[start:start + page_size]
+            parts = [cur.mogrify(template, r) for r in page]
+            if parts and isinstance(parts[0], bytes):
+                # MySQLdb 的 mogrify 回傳 bytes；pymysql 回傳 str
+                sql: Any = sql_prefix.encode() + b" VALUES " + b",".join(parts) + suffix.encode()
+            else:
+                sql = sql_prefix + " VALUES " + ",".join(parts) + suffix
+            cur.execute(sql)
+            affected += cur.rowcount
+    return affected
+
+def dao_bulk_executemany(conn: pymysql.connections.Connection, sql: str, rows: Iterable[Any], chunk: int = 1000, disable_checks: bool = False) -> int:
+    """
+    單一交易包住整批 executemany：
+    - 分批（chunk 筆）執行，但只在最後 commit 一次，redo log 的 fsync
+      由整批攤提，而不是每批一次
+    - 任一批失敗即 rollback 整批，維持全有或全無
+    - disable_checks=True 時，交易期間以 SET SESSION 關閉
+      unique_checks/foreign_key_checks（僅限可信資料的匯入，結束後還原）
+    - rows 以 islice 逐批具現化，支援 generator 輸入而不佔整批記憶體
+    """
+    it = iter(rows)
+    affected = 0
+    # pymysql 有顯式 begin()；MySQLdb 在 autocommit=False 下隱式開啟交易
+    begin = getattr(conn, "begin", None)
+    if begin is not None:
+        begin()
+    try:
         with conn.cursor() as cur:
-            for r in rows:
-                cur.execute(sql, r)  # 若 r 不是 dict，且 SQL 用 %(key)s，將觸發「format requires a mapping」
+            if disable_checks:
+                cur.execute("SET SESSION unique_checks=0, foreign_key_checks=0")
+            while True:
+                batch = list(itertools.islice(it, chunk))
+                if not batch:
+                    break
+                cur.executemany(sql, batch)
                 affected += cur.rowcount
+        conn.commit()
         return affected
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if disable_checks:
+            # rollback 不會還原 SESSION 變數，統一在 finally 復原；
+            # 復原本身失敗（如連線已斷）不可蓋掉原始例外——
+            # 斷線的連線回池後會被 acquire 的 ping 淘汰
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SET SESSION unique_checks=1, foreign_key_checks=1")
+            except Exception:
+                pass
+
+def dao_bulk_load(conn: pymysql.connections.Connection, table: str, columns: Iterable[str], rows: Iterable[Iterable[Any]]) -> int:
+    """
+    以 LOAD DATA LOCAL INFILE 大量載入（數千列以上的匯入路徑）：
+    - multi-VALUES 的 executemany 仍受限於 server 端逐列 SQL 解析，
+      LOAD DATA 直接以 CSV 串流進儲存引擎，常見有 5-20 倍差距
+    - rows 先寫入暫存 CSV（None 輸出為 \\N 表示 SQL NULL），載入後刪除
+    - table/columns 為識別字，無法參數化，僅允許英數與底線，
+      防止呼叫端不慎拼接出可注入的字串
+    需要 server 端 local_infile=1 且連線開啟 local_infile（池設定已開）。
+    回傳受影響列數；呼叫端自行 commit。
+    """
+    cols = list(columns)
+    for ident in [table, *cols]:
+        if not _IDENT_RE.fullmatch(ident):
+            raise ValueError(f"非法識別字: {ident!r}")
 
-    @staticmethod
-    def query(conn: pymysql.connections.Connection, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        # 查詢並回傳所有結果（list of dict）
+    tmp = tempfile.NamedTemporaryFile(
+        mode="w", encoding="utf-8", newline="", suffix=".csv", delete=False
+    )
+    try:
+        writer = csv.writer(tmp, lineterminator="\n")
+        for row in rows:
+            writer.writerow(["\\N" if v is None else v for v in row])
+        tmp.close()
+        sql = (
+            f"LOAD DATA LOCAL INFILE '{tmp.name}' "
+            f"INTO TABLE {table} "
+            "CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' ENCLOSED BY '\"' "
+            "LINES TERMINATED BY '\\n' "
+            f"({', '.join(cols)})"
+        )
         with conn.cursor() as cur:
+            cur.execute(sql)
+            return cur.rowcount
+    finally:
+        tmp.close()
+        try:
+            os.unlink(tmp.name)
+        except OSError:
+            pass
+
+def dao_query(conn: pymysql.connections.Connection, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Tuple[Any, ...]]:
+    # 查詢並回傳所有結果（list of tuple；需要欄名對應時改用 dao_query_dict）
+    with conn.cursor() as cur:
+        if not _try_prepared(cur, conn, sql, params):
             cur.execute(sql, params or {})
-            return list(cur.fetchall())
+        return list(cur.fetchall())
 
-    @staticmethod
-    def commit(conn: pymysql.connections.Connection) -> None:
-        # 提交交易
-        conn.commit()
+def dao_query_dict(conn: pymysql.connections.Connection, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    # 查詢並回傳 list of dict：
+    # 欄名只從 cur.description 取一次，再 zip 成 dict，
+    # 比 DictCursor 逐列重建鍵字串省下大半開銷
+    with conn.cursor() as cur:
+        if not _try_prepared(cur, conn, sql, params):
+            cur.execute(sql, params or {})
+        # 欄名 intern：跨查詢共用同一份鍵字串（見 _InternFieldsMixin）
+        cols = [sys.intern(d[0]) for d in cur.description] if cur.description else []
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
 
-    @staticmethod
-    def rollback(conn: pymysql.connections.Connection) -> None:
-        # 回滾交易
-        conn.rollback()
+def dao_iter_query(conn: pymysql.connections.Connection, sql: str, params: Optional[Dict[str, Any]] = None, batch: int = 1000):
+    """
+    大結果集的串流查詢版本：
+    - 使用 SSDictCursor（unbuffered），server 端逐批送出，client 不會
+      一次把整個結果集具現化進記憶體
+    - 以 fetchmany(batch) 分批抓取並逐列 yield，峰值記憶體為 O(batch)
+      而非 O(N)
+    注意：在結果讀完（或 generator 關閉）之前，同一連線不可再發其他查詢。
+    """
+    with conn.cursor(_SS_DICT_CURSOR) as cur:
+        cur.execute(sql, params or {})
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield from rows
+
+def dao_query_cached(conn: pymysql.connections.Connection, sql: str, params: Optional[Dict[str, Any]] = None, ttl: float = 30.0) -> List[Tuple[Any, ...]]:
+    """
+    唯讀 SELECT 的結果快取版本：
+    - 命中時直接回傳快取結果（零 server 往返），未命中才實際查詢
+    - 寫入類 SQL 或含 FOR UPDATE 的查詢不進快取，直接透查
+    - 寫入後請呼叫 dao_invalidate_cache 讓相關結果失效
+    快取內外皆為獨立 list：呼叫端對回傳值 append/sort 不會汙染快取。
+    """
+    if not CACHETOOLS_AVAILABLE or _UNCACHEABLE_SQL.search(sql):
+        return dao_query(conn, sql, params)
+
+    key = _cache_key(sql, params)
+    cache = None
+    with _RESULT_CACHE_LOCK:
+        cache = _result_cache(ttl)
+        hit = cache.get(key)
+    if hit is not None:
+        return list(hit)
+    rows = dao_query(conn, sql, params)
+    with _RESULT_CACHE_LOCK:
+        cache[key] = list(rows)
+    return rows
+
+def dao_invalidate_cache(prefix: Optional[str] = None) -> None:
+    # 寫入後失效：prefix=None 清空全部，否則清掉 SQL 以 prefix 開頭的項目
+    with _RESULT_CACHE_LOCK:
+        for cache in _RESULT_CACHES.values():
+            if prefix is None:
+                cache.clear()
+            else:
+                for key in [k for k in cache.keys() if k[0].startswith(prefix)]:
+                    del cache[key]
+
+def dao_commit(conn: pymysql.connections.Connection) -> None:
+    # 提交交易
+    conn.commit()
+
+def dao_rollback(conn: pymysql.connections.Connection) -> None:
+    # 回滾交易
+    conn.rollback()
+
+class Dao:
+    """
+    既有呼叫端的薄相容層：實作在模組層的 dao_* 函式。
+    - execute/executemany/query/...：對應 dao_execute 等，行為不變
+    - __slots__ 為空：此類不建立實例，也不該被掛任何屬性
+    重複執行的 SQL 會在各連線上以 server-side prepared statement 快取，跳過重複解析。
+    """
+    __slots__ = ()
+
+    execute = staticmethod(dao_execute)
+    executemany = staticmethod(dao_executemany)
+    execute_values = staticmethod(dao_execute_values)
+    bulk_executemany = staticmethod(dao_bulk_executemany)
+    bulk_load = staticmethod(dao_bulk_load)
+    query = staticmethod(dao_query)
+    query_dict = staticmethod(dao_query_dict)
+    iter_query = staticmethod(dao_iter_query)
+    query_cached = staticmethod(dao_query_cached)
+    invalidate_cache = staticmethod(dao_invalidate_cache)
+    commit = staticmethod(dao_commit)
+    rollback = staticmethod(dao_rollback)
+
+# 高頻語句預先編碼為 bytes：驅動內部反正要 encode 一次，
+# 常數先編好可讓每次呼叫跳過這步（無參數語句才適用）
+SQL_PING = b"SELECT 1 AS ok"
+
+# healthcheck 的短 TTL 記憶：readiness probe 常以數 Hz 輪詢，
+# 一秒視窗內的重複呼叫直接回傳上次結果，DB 只承受 1Hz 的實際查詢；
+# Lock 讓同時湧入的 probe 只有一個觸發刷新（避免 thundering herd）
+_HC_TTL = 1.0
+_HC_LOCK = threading.Lock()
+_hc_last_ok = False
+_hc_last_ts = float("-inf")
 
 def healthcheck() -> bool:
     """
     執行最小查詢以檢查 DB 連線是否可用：
     - SELECT 1 AS ok
     - 回傳 True 表示健康
+    結果快取 1 秒：高頻輪詢不會對 DB 造成等比例的查詢壓力。
     """
+    global _hc_last_ok, _hc_last_ts
+    # 快路徑：視窗內直接回傳（讀取為原子操作，不需持鎖）
+    if time.monotonic() - _hc_last_ts < _HC_TTL:
+        return _hc_last_ok
+    with _HC_LOCK:
+        # double-check：排隊期間可能已有別的 probe 刷新過
+        if time.monotonic() - _hc_last_ts < _HC_TTL:
+            return _hc_last_ok
+        ok = _healthcheck_uncached()
+        _hc_last_ok = ok
+        _hc_last_ts = time.monotonic()
+        return ok
+
+def _healthcheck_uncached() -> bool:
+    # 實際打 DB 的版本（healthcheck 的 TTL 快取包在外層）
     def _hc(c: pymysql.connections.Connection) -> bool:
         try:
             with c.cursor() as cur:
-                cur.execute("SELECT 1 AS ok")
+                cur.execute(SQL_PING)
                 row = cur.fetchone()
-                # 因為使用 DictCursor，row 為 dict，取出 ok 應為 1
-                return bool(row and row.get("ok") == 1)
+                # 預設 tuple cursor，row 為 (1,)
+                return bool(row and row[0] == 1)
         except Exception:
             return False
     return with_conn(_hc)
@@ -0,0 +1,86 @@
+# 檔名：db_async.py
+# 專案路徑：src/storage/db_async.py
+# 功能：aiomysql 版的非同步連線池與查詢工具，與 db.py 並行存在。
+#
+# 設計說明：
+# - db.py 的執行緒池模型每條連線綁一條執行緒，併發高時付出執行緒切換成本；
+#   這裡改用 asyncio + aiomysql，多個獨立查詢可在單一事件圈上同時在途。
+# - 僅提供最小介面（get_pool / aquery / ahealthcheck），需要交易控制的
+#   寫入路徑仍走 db.py 的同步 Dao。
+# - aiomysql 為選用依賴：未安裝時 import 本模組會在第一次使用時拋出明確錯誤。
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from src.common.env_loader import load_env, get_env
+
+try:
+    # aiomysql 基於 pymysql 的協定實作，提供 asyncio 連線池
+    import aiomysql
+    AIOMYSQL_AVAILABLE = True
+except ImportError:
+    AIOMYSQL_AVAILABLE = False
+
+# 初始化環境變數（與 db.py 相同的設定來源）
+load_env()
+
+def _pool_maxsize(default: int = 5) -> int:
+    # 與 db.py 的 _get_pool_size 同語意：池大小由 DB_POOL_SIZE 控制
+    raw = get_env("DB_POOL_SIZE", str(default))
+    try:
+        return int(raw)
+    except Exception:
+        return default
+
+async def get_pool(minsize: int = 1, maxsize: Optional[int] = None) -> "aiomysql.Pool":
+    """
+    建立 aiomysql 連線池（呼叫端自行持有並於結束時 close + wait_closed）。
+    設定來源與 db.py 相同（DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME）。
+    """
+    if not AIOMYSQL_AVAILABLE:
+        raise RuntimeError("aiomysql 未安裝，請先 pip install aiomysql")
+    return await aiomysql.create_pool(
+        minsize=minsize,
+        maxsize=maxsize if maxsize is not None else _pool_maxsize(),
+        host=get_env("DB_HOST", "localhost"),
+        port=int(get_env("DB_PORT", "3306")),
+        user=get_env("DB_USER", "root"),
+        password=get_env("DB_PASSWORD", ""),
+        db=get_env("DB_NAME", "twa_etf_engine"),
+        charset="utf8mb4",
+        autocommit=False,
+    )
+
+async def aquery(pool: "aiomysql.Pool", sql: str, params: Optional[Any] = None) -> List[Dict[str, Any]]:
+    """
+    執行查詢並回傳 list of dict。
+    多個 aquery 以 asyncio.gather 同時發出時，各自向池借連線並行在途，
+    不需要每連線一條執行緒。
+    """
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(sql, params or {})
+            rows = await cur.fetchall()
+            return list(rows)
+
+async def aexecute(pool: "aiomysql.Pool", sql: str, params: Optional[Any] = None) -> int:
+    """
+    執行單一寫入語句並 commit，回傳受影響列數。
+    """
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params or {})
+            affected = cur.rowcount
+        await conn.commit()
+        return affected
+
+async def ahealthcheck(pool: "aiomysql.Pool", probes: int = 1) -> bool:
+    """
+    以 N 個並行的 SELECT 1 驗證池的可用性（probes>1 可順便驗證併發取線）。
+    全部成功才回傳 True。
+    """
+    try:
+        results = await asyncio.gather(*[aquery(pool, "SELECT 1 AS ok") for _ in range(max(1, probes))])
+        return all(r and r[0].get("ok") == 1 for r in results)
+    except Exception:
+        return False